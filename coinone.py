@@ -19,6 +19,10 @@ Functions:
     buy(price, target=BTC):
         Places a market buy order for the specified target currency at the given price.
 
+    wait_for_order(order_id, target=BTC, timeout=5.0):
+        Polls the order detail until the order is filled or canceled, or the timeout passes,
+        and returns the last order detail response.
+
     get_current_price(target=BTC):
         Retrieves the current price of the specified target currency in the quote currency.
 
@@ -31,52 +35,87 @@ Functions:
 """
 
 import base64
-import hashlib
 import hmac
-import json
 import uuid
+import secrets
 import os
-from functools import reduce
 import time
 import datetime
-import pprint
-import httplib2
+import orjson
+import requests
 from dotenv import load_dotenv
 
 load_dotenv()
 
-ACCESS_TOKEN = os.getenv("API_ACCESS_KEY_COINONE")
-SECRET_KEY = bytes(os.getenv("API_SECRET_KEY_COINONE"), "utf-8")
-DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
 
-AMOUNT = os.getenv("AMOUNT")
+def _require_env(name):
+    value = os.getenv(name)
+    if not value:
+        raise RuntimeError(f"환경변수 {name}가 설정되어 있지 않습니다.")
+    return value
+
+
+ACCESS_TOKEN = _require_env("API_ACCESS_KEY_COINONE")
+SECRET_KEY = bytes(_require_env("API_SECRET_KEY_COINONE"), "utf-8")
+DISCORD_WEBHOOK_URL = _require_env("DISCORD_WEBHOOK_URL")
+
+# 비밀 키로 초기화한 HMAC 상태를 한 번만 만들고 서명할 때마다 복사해서 사용
+_HMAC_TEMPLATE = hmac.new(SECRET_KEY, digestmod="sha512")
+
 CURRENCY_BUY = os.getenv("CURRENCY_BUY", "BTC")
 CURRENCY_HOLD = os.getenv("CURRENCY_HOLD", "KRW")
 
 IS_ACTIVE = os.getenv("IS_ACTIVE", "FALSE")
 IS_ACTIVE = IS_ACTIVE.strip().lower() in ["true", "1", "yes"]
 
+# 주문 금액은 자동 매수가 활성화된 경우에만 필요
+AMOUNT = _require_env("AMOUNT") if IS_ACTIVE else os.getenv("AMOUNT")
+
+DEBUG = os.getenv("DEBUG", "FALSE").strip().lower() in ["true", "1", "yes"]
+
+BASE_URL = "https://api.coinone.co.kr"
+_BASE_HEADERS = {"Content-type": "application/json"}
+REQUEST_TIMEOUT = 5.0
+
+# 요청마다 바뀌지 않는 필드를 미리 채워둔 페이로드 템플릿 (호출 시 복사해서 사용)
+_BALANCE_PAYLOAD = {"access_token": ACCESS_TOKEN}
+_BUY_PAYLOAD = {
+    "access_token": ACCESS_TOKEN,
+    "quote_currency": CURRENCY_HOLD,
+    "type": "MARKET",
+    "side": "BUY",
+}
+_ORDER_INFO_PAYLOAD = {"access_token": ACCESS_TOKEN, "quote_currency": CURRENCY_HOLD}
+
+# 더 이상 체결 상태가 바뀌지 않는 주문 상태
+_ORDER_DONE_STATUSES = {"FILLED", "CANCELED", "PARTIALLY_CANCELED"}
+
+# 프로세스 전체에서 하나의 세션을 재사용해 TCP/TLS 연결을 유지(keep-alive)
+SESSION = requests.Session()
+
+# (기준 통화, 대상 통화) -> (가격, 조회 시각)
+_PRICE_CACHE = {}
+
 
 def get_encoded_payload(payload):
     payload["nonce"] = str(uuid.uuid4())
 
-    dumped_json = json.dumps(payload)
-    encoded_json = base64.b64encode(bytes(dumped_json, "utf-8"))
-    return encoded_json
+    return base64.b64encode(orjson.dumps(payload))
 
 
 def get_signature(encoded_payload):
-    signature = hmac.new(SECRET_KEY, encoded_payload, hashlib.sha512)
+    signature = _HMAC_TEMPLATE.copy()
+    signature.update(encoded_payload)
     return signature.hexdigest()
 
 
 def get_response(action, payload, method="POST"):
-    url = "{}{}".format("https://api.coinone.co.kr", action)
+    url = f"{BASE_URL}{action}"
 
     encoded_payload = get_encoded_payload(payload)
 
     headers = {
-        "Content-type": "application/json",
+        **_BASE_HEADERS,
         "X-COINONE-PAYLOAD": encoded_payload,
         "X-COINONE-SIGNATURE": get_signature(encoded_payload),
     }
@@ -87,14 +126,17 @@ def get_response(action, payload, method="POST"):
     if payload:
         print(f"[API PAYLOAD] {payload}")
 
-    http = httplib2.Http()
-
     try:
-        response, content = http.request(url, method, headers=headers)
-        response_data = json.loads(content)
+        response = SESSION.request(
+            method,
+            url,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT,
+        )
+        response_data = orjson.loads(response.content)
         
         # 로깅: 응답 정보
-        print(f"[API RESPONSE] Status: {response.status}")
+        print(f"[API RESPONSE] Status: {response.status_code}")
         print(f"[API RESPONSE] Data: {response_data}")
         
         return response_data
@@ -104,19 +146,17 @@ def get_response(action, payload, method="POST"):
 
 
 def get_balance(*currencies):
-    arg_balance = {
-        "action": "/v2.1/account/balance",
-        "payload": {"access_token": ACCESS_TOKEN, "currencies": currencies},
-    }
+    payload = _BALANCE_PAYLOAD.copy()
+    payload["currencies"] = currencies
 
-    return get_response(**arg_balance)
+    return get_response("/v2.1/account/balance", payload)
 
 
 def get_balance_info(*currencies):
     balance = get_balance(*currencies)
     balances = balance["balances"]
 
-    def format_balance(acc, curr):
+    def format_balance(curr):
         currency_upper = curr['currency'].upper()
         
         # 기준 통화(CURRENCY_HOLD)는 가격 조회하지 않음
@@ -124,57 +164,55 @@ def get_balance_info(*currencies):
             value_info = f"총 보유 가치: {int(float(curr['available'])):,} {CURRENCY_HOLD}\n"
         else:
             # 다른 통화는 현재 가격으로 계산
-            current_price = float(get_current_price(curr['currency']))
+            current_price = _cached_price(curr['currency'])
             total_value = int(float(curr['available']) * current_price)
             value_info = f"총 보유 가치: {total_value:,} {CURRENCY_HOLD}\n"
         
         return (
-            acc
-            + f"\n**[{curr['currency']}]**\n"
-            + f"현재 보유량: {float(curr['available']):,} {curr['currency']}\n"
-            + f"매수 평균가: {float(curr['average_price']):,} {CURRENCY_HOLD}\n"
-            + value_info
+            f"\n**[{curr['currency']}]**\n"
+            f"현재 보유량: {float(curr['available']):,} {curr['currency']}\n"
+            f"매수 평균가: {float(curr['average_price']):,} {CURRENCY_HOLD}\n"
+            f"{value_info}"
         )
 
-    report = reduce(format_balance, balances, "")
+    report = "".join(format_balance(curr) for curr in balances)
 
-    report = "=== 자산 별 보유 현황 ===\n" + report
-    return report
+    return "=== 자산 별 보유 현황 ===\n" + report
 
 
 def buy(amount, limit_price, target=CURRENCY_BUY):
 
-    order_id = str(uuid.uuid4())
-
-    arg_buy = {
-        "action": "/v2.1/order",
-        "payload": {
-            "access_token": ACCESS_TOKEN,
-            "quote_currency": CURRENCY_HOLD,
-            "target_currency": target,
-            "type": "MARKET",
-            "side": "BUY",
-            "amount": amount,
-            "limit_price": limit_price,
-            "user_order_id": order_id,
-        },
-    }
+    payload = _BUY_PAYLOAD.copy()
+    payload.update(
+        target_currency=target,
+        amount=amount,
+        limit_price=limit_price,
+        user_order_id=secrets.token_hex(16),
+    )
 
-    return get_response(**arg_buy)
+    return get_response("/v2.1/order", payload)
 
 
 def get_order_info(order_id, target=CURRENCY_BUY):
-    arg_order_info = {
-        "action": "/v2.1/order/detail",
-        "payload": {
-            "access_token": ACCESS_TOKEN,
-            "order_id": order_id,
-            "quote_currency": CURRENCY_HOLD,
-            "target_currency": target,
-        },
-    }
+    payload = _ORDER_INFO_PAYLOAD.copy()
+    payload.update(order_id=order_id, target_currency=target)
+
+    return get_response("/v2.1/order/detail", payload)
 
-    return get_response(**arg_order_info)
+
+def wait_for_order(order_id, target=CURRENCY_BUY, timeout=5.0):
+    # 주문이 체결(또는 취소)될 때까지 간격을 늘려가며 조회, 제한 시간이 지나면 마지막 결과 반환
+    deadline = time.monotonic() + timeout
+    backoff = 0.05
+
+    while True:
+        order_info = get_order_info(order_id, target=target)
+        status = order_info.get("order", {}).get("status")
+        if status in _ORDER_DONE_STATUSES or time.monotonic() + backoff >= deadline:
+            return order_info
+
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 1.0)
 
 
 def get_current_price(target=CURRENCY_BUY):
@@ -188,30 +226,48 @@ def get_current_price(target=CURRENCY_BUY):
     return price["tickers"][0]["best_asks"][0]["price"]
 
 
+def _cached_price(target=CURRENCY_BUY, ttl=5.0):
+    key = (CURRENCY_HOLD, target.upper())
+    cached = _PRICE_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[1] < ttl:
+        return cached[0]
+
+    price = float(get_current_price(target))
+    _PRICE_CACHE[key] = (price, time.monotonic())
+    return price
+
+
 def send_discord_message(message):
     payload = {"content": str(message)}
     headers = {"Content-Type": "application/json"}
-    http = httplib2.Http()
     try:
-        response, content = http.request(
-            DISCORD_WEBHOOK_URL, "POST", headers=headers, body=json.dumps(payload)
+        response = SESSION.post(
+            DISCORD_WEBHOOK_URL,
+            headers=headers,
+            data=orjson.dumps(payload),
+            timeout=REQUEST_TIMEOUT,
         )
-        if response.status != 204:
-            print(f"Failed to send message to Discord: {content}")
+        if response.status_code != 204:
+            print(f"Failed to send message to Discord: {response.content}")
     except Exception as e:
         print(f"Exception occurred: {str(e)}")
         raise
 
 
 def get_order_result_report(order, currency=CURRENCY_BUY):
+    ordered_at_s, ordered_at_ms = divmod(int(order['ordered_at']), 1000)
+    ordered_at = datetime.datetime.fromtimestamp(ordered_at_s).replace(
+        microsecond=ordered_at_ms * 1000
+    )
+
     return (
         f"**[주문 ID]**\n {order['order_id']}\n\n"
-        + f"**[주문 시각]**\n{datetime.datetime.fromtimestamp(order['ordered_at']/1000)}\n\n"
-        + f"**[주문 가격]**\n{int(order['average_executed_price']):,} {CURRENCY_HOLD}\n\n"
-        + f"**[체결 수량]**\n{order['executed_qty']} {currency}\n\n"
-        + f"**[체결 금액]**\n{float(order['traded_amount']):,} {CURRENCY_HOLD}\n\n"
-        + f"**[주문 상태]**\n{order['status']}\n\n"
-        + f"**[수수료]**\n{float(order['fee']):,} {CURRENCY_HOLD}\n\n"
+        f"**[주문 시각]**\n{ordered_at}\n\n"
+        f"**[주문 가격]**\n{int(order['average_executed_price']):,} {CURRENCY_HOLD}\n\n"
+        f"**[체결 수량]**\n{order['executed_qty']} {currency}\n\n"
+        f"**[체결 금액]**\n{float(order['traded_amount']):,} {CURRENCY_HOLD}\n\n"
+        f"**[주문 상태]**\n{order['status']}\n\n"
+        f"**[수수료]**\n{float(order['fee']):,} {CURRENCY_HOLD}\n\n"
     )
 
 
@@ -219,7 +275,7 @@ def place_buy_order(amount=AMOUNT, currency=CURRENCY_BUY):
 
     # balance = get_balance(CURRENCY_HOLD, currency)
     # hold_balance = float(balance[CURRENCY_HOLD.lower()]["balance"])
-    current_price = float(get_current_price(currency))
+    current_price = _cached_price(currency)
 
     # if hold_balance < 5000:
     #     send_discord_message(f"{CURRENCY_HOLD} balance is less than 5000")
@@ -227,17 +283,28 @@ def place_buy_order(amount=AMOUNT, currency=CURRENCY_BUY):
 
     buy_response = buy(amount=amount, limit_price=current_price * 1.03, target=currency)
 
-    time.sleep(1)
     if buy_response["result"] == "success":
-        order_info = get_order_info(buy_response["order_id"], target=currency)
+        order_info = wait_for_order(buy_response["order_id"], target=currency)
 
-        pprint.pprint(order_info)
+        if DEBUG:
+            import pprint
+
+            pprint.pprint(order_info)
+
+        order = order_info.get("order")
+        if order is None:
+            # 제한 시간 안에 주문 상세를 받지 못한 경우 주문 접수 결과로 대신 보고
+            order_report = (
+                f"**[주문 ID]**\n {buy_response['order_id']}\n\n"
+                f"주문 상세 정보를 조회하지 못했습니다.\n사유: {order_info}\n\n"
+            )
+        else:
+            order_report = get_order_result_report(order, currency)
 
         send_discord_message(
             "**===== 주문이 접수되었습니다 =====**\n\n"
-            + get_order_result_report(order_info["order"], currency)
-            + "\n"
-            + get_balance_info(CURRENCY_HOLD, currency)
+            f"{order_report}\n"
+            f"{get_balance_info(CURRENCY_HOLD, currency)}"
         )
 
     else: